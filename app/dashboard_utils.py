@@ -9,6 +9,7 @@ from sklearn.metrics import mean_squared_error, r2_score
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from backend import features
 from backend.config import Settings
 from backend.db_tools import DBEngine
 
@@ -20,6 +21,17 @@ def connect_db() -> DBEngine:
     return db_engine
 
 
+@st.cache_resource
+def _load_growth_features(_db_engine: DBEngine, version: str) -> pl.DataFrame:
+    return features.load_growth_features(db_engine=_db_engine, version=version)
+
+
+def growth_features(db_engine: DBEngine) -> pl.DataFrame:
+    """Load the growth features once per data version, shared by all sessions."""
+    version = features.data_version(db_engine)
+    return _load_growth_features(_db_engine=db_engine, version=version)
+
+
 def divide_columns_by_column(
     df: pl.DataFrame, divide_by_column: str, columns_to_exclude: list[str]
 ) -> pl.DataFrame:
@@ -12,10 +12,6 @@ from backend.crud import get_bevolking_landelijk, get_bodemgebruik_landelijk
 from app.dashboard_utils import divide_columns_by_column, connect_db
 
 
-get_bevolking_landelijk = st.cache_data(get_bevolking_landelijk)
-get_bodemgebruik_landelijk = st.cache_data(get_bodemgebruik_landelijk)
-
-
 def main():
     st.set_page_config(
         page_title="Nederland",
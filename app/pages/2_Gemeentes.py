@@ -11,9 +11,6 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from backend.crud import get_data_gemeentes, get_data_gemeentes_bodemgebruik
 from app.dashboard_utils import divide_columns_by_column, extract_top5, connect_db
 
-get_data_gemeentes = st.cache_data(get_data_gemeentes)
-get_data_gemeentes_bodemgebruik = st.cache_data(get_data_gemeentes_bodemgebruik)
-
 
 def main():
     st.set_page_config(
@@ -8,12 +8,8 @@ import streamlit as st
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from backend.crud import get_data_gemeentes, get_data_gemeentes_bodemgebruik
-from backend.utils import growth_columns_by_year
-from app.dashboard_utils import connect_db
-
-get_data_gemeentes = st.cache_data(get_data_gemeentes)
-get_data_gemeentes_bodemgebruik = st.cache_data(get_data_gemeentes_bodemgebruik)
+from backend.features import EXCLUDE_COLS
+from app.dashboard_utils import connect_db, growth_features
 
 
 def main():
@@ -21,10 +17,7 @@ def main():
         page_title="Bevolkingsgroei vs Bodemgebruik",
     )
     db_engine = connect_db()
-    df_bevolking = get_data_gemeentes(_db_engine=db_engine)
-    df_bodem = get_data_gemeentes_bodemgebruik(_db_engine=db_engine)
-    devdf_bevolking = df_bevolking.clone()
-    devdf_bodem = df_bodem.clone()
+    devdf_bodem = growth_features(db_engine)
 
     st.markdown(
         """
@@ -38,30 +31,10 @@ def main():
         """
     )
 
-    regios = devdf_bevolking["regio"].to_list()
-    exclude_cols = ["regio", "jaar", "geslacht", "catgroup", "burgerlijkestaat"]
-    devdf_bodem = df_bodem.filter(df_bodem["regio"].is_in(regios))
-    devdf_bodem = devdf_bodem.fill_null(strategy="zero")
-    devdf_bodem = growth_columns_by_year(
-        df=devdf_bodem, columns_to_exclude=exclude_cols
-    )
-    devdf_bodem = devdf_bodem[
-        [s.name for s in devdf_bodem if not (s.null_count() == devdf_bodem.height)]
-    ]
-    devdf_bodem = devdf_bodem.drop_nulls("bevolking_1_januari_growth")
-
-    devdf_bodem = devdf_bodem.select(
-        [
-            col
-            for col in devdf_bodem.columns
-            if (col in exclude_cols) or (col.endswith("growth"))
-        ]
-    )
-
     # Use a clone of the data for model training
     model_df = devdf_bodem.clone().to_pandas()
 
-    use_cols = [col for col in devdf_bodem.columns if col not in exclude_cols]
+    use_cols = [col for col in devdf_bodem.columns if col not in EXCLUDE_COLS]
 
     # Calculate the correlation matrix
     correlation_matrix = (
@@ -9,13 +9,13 @@ from sklearn.model_selection import train_test_split
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from backend.crud import get_data_gemeentes, get_data_gemeentes_bodemgebruik
-from backend.utils import growth_columns_by_year
-from app.dashboard_utils import load_models, model_metrics, connect_db
-
-
-get_data_gemeentes = st.cache_data(get_data_gemeentes)
-get_data_gemeentes_bodemgebruik = st.cache_data(get_data_gemeentes_bodemgebruik)
+from backend.features import MODEL_FEATURES, TARGET
+from app.dashboard_utils import (
+    load_models,
+    model_metrics,
+    connect_db,
+    growth_features,
+)
 
 
 def main():
@@ -34,56 +34,15 @@ def main():
         """
     )
     db_engine = connect_db()
-    df_bevolking = get_data_gemeentes(_db_engine=db_engine)
-    df_bodem = get_data_gemeentes_bodemgebruik(_db_engine=db_engine)
-    devdf_bevolking = df_bevolking.clone()
-    devdf_bodem = df_bodem.clone()
-
-    regios = devdf_bevolking["regio"].to_list()
-    exclude_cols = ["regio", "jaar", "geslacht", "catgroup", "burgerlijkestaat"]
-    devdf_bodem = df_bodem.filter(df_bodem["regio"].is_in(regios))
-    devdf_bodem = devdf_bodem.fill_null(strategy="zero")
-    devdf_bodem = growth_columns_by_year(
-        df=devdf_bodem, columns_to_exclude=exclude_cols
-    )
-    devdf_bodem = devdf_bodem[
-        [s.name for s in devdf_bodem if not (s.null_count() == devdf_bodem.height)]
-    ]
-    devdf_bodem = devdf_bodem.drop_nulls("bevolking_1_januari_growth")
+    devdf_bodem = growth_features(db_engine)
 
-    devdf_bodem = devdf_bodem.select(
-        [
-            col
-            for col in devdf_bodem.columns
-            if (col in exclude_cols) or (col.endswith("growth"))
-        ]
-    )
-
-    # Use a clone of the data for model training, and pick the features with the highest correlations
-    include_cols = [
-        "wegverkeersterrein_growth",
-        "woonterrein_growth",
-        "bedrijventerrein_growth",
-        "begraafplaats_growth",
-        "sportterrein_growth",
-        "volkstuin_growth",
-        "overig_agrarisch_terrein_growth",
-        "jaar",
-        "bevolking_1_januari_growth",
-    ]
-    model_df = devdf_bodem.clone().select(include_cols).to_pandas()
+    # Use the features with the highest correlations
+    model_df = devdf_bodem.select([*MODEL_FEATURES, "jaar", TARGET]).to_pandas()
     model_df.set_index("jaar", inplace=True)
 
     # Split the data into train and test sets
-    X = model_df[
-        [
-            col
-            for col in model_df.columns
-            if col not in ["bevolking_1_januari_growth", "jaar"]
-        ]
-    ]
-
-    y = model_df["bevolking_1_januari_growth"]
+    X = model_df[MODEL_FEATURES]
+    y = model_df[TARGET]
 
     model_names = [
         "LinearRegression",
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Callable, Union
+
+import polars as pl
+from loguru import logger
+
+
+class ResultCache:
+    """Cache of query results as Arrow IPC files, shared by processes and restarts.
+
+    Results are keyed by the query and a data version, which is stored in a stamp
+    file next to the results. Bumping the version invalidates every result, so it
+    should be done whenever the data behind the queries changes. Results are memory
+    mapped when read, and the least recently used results are evicted once the
+    cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stamp = self.cache_dir / "version"
+
+    def version(self) -> str:
+        """Return the current data version."""
+        try:
+            return self.stamp.read_text().strip()
+        except FileNotFoundError:
+            return ""
+
+    def bump_version(self) -> None:
+        """Invalidate all results, by starting a new data version."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_stamp = self.cache_dir / f"version.{uuid.uuid4().hex}.tmp"
+        tmp_stamp.write_text(uuid.uuid4().hex)
+        tmp_stamp.rename(self.stamp)
+
+        for path in self.cache_dir.glob("*.arrow"):
+            path.unlink(missing_ok=True)
+        logger.info(f"Invalidated the result cache in {self.cache_dir}.")
+
+    def path(self, query: str) -> Path:
+        key = hashlib.sha256(f"{self.version()}\n{query}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.arrow"
+
+    def get(self, query: str) -> Union[pl.DataFrame, None]:
+        """Return the cached result of a query, or None if it isn't cached."""
+        path = self.path(query)
+        try:
+            # Mark the result as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return pl.read_ipc(path, memory_map=True)
+
+    def put(self, query: str, df: pl.DataFrame) -> None:
+        """Store the result of a query."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(query)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        df.write_ipc(tmp_path, compression="uncompressed")
+        tmp_path.rename(path)
+        self.evict()
+
+    def get_or_compute(
+        self, query: str, compute: Callable[[], pl.DataFrame]
+    ) -> pl.DataFrame:
+        """Return the cached result of a query, computing and storing it on a miss."""
+        df = self.get(query)
+        if df is None:
+            df = compute()
+            self.put(query, df)
+        return df
+
+    def evict(self) -> None:
+        """Remove the least recently used results until the cache fits in max_bytes."""
+        results = []
+        for path in self.cache_dir.glob("*.arrow"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            results.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in results)
+        for _, size, path in sorted(results):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -4,6 +4,13 @@ from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class QueryBackend(Enum):
+    """Enum for the engines that can answer the queries of the dashboard."""
+
+    POSTGRES = "postgres"
+    PARQUET = "parquet"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -11,6 +18,13 @@ class Settings(BaseSettings):
     db_user: str = Field(alias="DBUSER")
     db_pass: str = Field(alias="DBPASS")
     db_port: str = Field(alias="DBPORT")
+    query_backend: QueryBackend = Field(
+        default=QueryBackend.POSTGRES, alias="QUERY_BACKEND"
+    )
+    parquet_dir: str = Field(default="data/parquet", alias="PARQUET_DIR")
+    feature_dir: str = Field(default="data/features", alias="FEATURE_DIR")
+    cache_dir: str = Field(default="data/cache", alias="CACHE_DIR")
+    cache_size_mb: int = Field(default=1024, alias="CACHE_SIZE_MB")
 
 
 class DFType(Enum):
@@ -1,3 +1,4 @@
+import io
 import sys
 from pathlib import Path
 from typing import Union
@@ -8,15 +9,21 @@ import polars as pl
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from loguru import logger
-from sqlalchemy import select
+from sqlalchemy import Table, select, text
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.declarative import DeclarativeMeta
 
-from backend.config import DFType
+from backend import parquet_queries
+from backend.config import DFType, QueryBackend
 from backend.db_tools import DBEngine
 from backend.models import (
+    Base,
     Bevolking,
+    BevolkingGemeentes,
+    BevolkingLandelijk,
     Bodemgebruik,
+    BodemgebruikGemeentes,
+    BodemgebruikLandelijk,
     Burgstaat,
     CategoryGroup,
     Geslacht,
@@ -26,12 +33,17 @@ from backend.models import (
 )
 
 
+def compile_stmt(stmt: select, db_engine: DBEngine) -> str:
+    """Compile a statement to SQL, with its parameters inlined."""
+    return stmt.compile(
+        bind=db_engine.engine, compile_kwargs={"literal_binds": True}
+    ).string
+
+
 def fetch_data(
     stmt: select, db_engine: DBEngine, package: DFType = DFType.POLARS
 ) -> Union[pl.DataFrame, pd.DataFrame]:
-    compiled_stmt = stmt.compile(
-        bind=db_engine.engine, compile_kwargs={"literal_binds": True}
-    ).string
+    compiled_stmt = compile_stmt(stmt=stmt, db_engine=db_engine)
 
     if package.name == "POLARS":
         result_df = pl.read_database(query=compiled_stmt, connection=db_engine.engine)
@@ -88,153 +100,144 @@ def upsert(
     db_engine.session.commit()
 
 
-def get_bevolking_landelijk(_db_engine: DBEngine):
-    stmt = (
-        select(
-            Bevolking.bevolking_1_januari,
-            Geslacht.geslacht,
-            Regios.regio,
-            CategoryGroup.catgroup,
-            Burgstaat.burgerlijkestaat,
-            Perioden.jaar,
-        )
-        .join(
-            Geslacht,
-            Bevolking.geslacht_key == Geslacht.geslacht_key,
-        )
-        .join(Perioden, Bevolking.datum_key == Perioden.datum_key)
-        .join(Regios, Bevolking.regio_key == Regios.regio_key)
-        .join(
-            Leeftijd,
-            Bevolking.leeftijd_key == Leeftijd.leeftijd_key,
-        )
-        .join(
-            CategoryGroup,
-            Leeftijd.categorygroupid == CategoryGroup.catgroup_key,
-        )
-        .join(Burgstaat, Bevolking.burgst_key == Burgstaat.burgst_key)
-        .filter(Regios.regio_key == "NL01  ")
-        .filter(CategoryGroup.catgroup == "Totaal")
-        .filter(Burgstaat.burgerlijkestaat == "Totaal burgerlijke staat")
+def table_schema(table: DeclarativeMeta) -> dict[str, pl.DataType]:
+    """Map the columns of a table to their Polars dtypes."""
+    dtypes = {int: pl.Int64, float: pl.Float64, str: pl.Utf8}
+    return {
+        column.name: dtypes[column.type.python_type]
+        for column in table.__table__.columns
+    }
+
+
+def cast_to_table(df: pl.DataFrame, table: DeclarativeMeta) -> pl.DataFrame:
+    """Select the columns of a table from a dataframe, cast to their Polars dtypes."""
+    return df.select(
+        [pl.col(column).cast(dtype) for column, dtype in table_schema(table).items()]
     )
 
-    df = fetch_data(stmt=stmt, db_engine=_db_engine, package=DFType.POLARS)
+
+def copy_upsert(
+    db_engine: DBEngine,
+    table: DeclarativeMeta,
+    df: pl.DataFrame,
+    batch_size: int = 100000,
+) -> int:
+    """Upsert a dataframe into database by COPYing it into a staging table."""
+    if df.is_empty():
+        logger.warning(f"No data to upsert into {table.__tablename__}.")
+        return 0
+
+    tablename = table.__tablename__
+    staging = f"staging_{tablename}"
+    primary_key = table.__table__.primary_key.columns.values()[0].name
+    columns = ", ".join(df.columns)
+    updates = ", ".join(
+        f"{column} = EXCLUDED.{column}"
+        for column in df.columns
+        if column != primary_key
+    )
+
+    # A single statement can't update the same row twice, so keep the last occurrence
+    df = df.unique(subset=primary_key, keep="last", maintain_order=True)
+
+    connection = db_engine.engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} (LIKE {tablename} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            # Stream the frame in slices, so the CSV buffer stays small
+            for frame in df.iter_slices(n_rows=batch_size):
+                buffer = io.BytesIO()
+                frame.write_csv(buffer)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+                    buffer,
+                )
+            cursor.execute(
+                f"INSERT INTO {tablename} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({primary_key}) DO UPDATE SET {updates}"
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return df.height
+
+
+def refresh_materialized_views(db_engine: DBEngine) -> None:
+    """Refresh the materialized views that are read by the dashboard."""
+    views = [
+        table
+        for table in Base.metadata.sorted_tables
+        if table.info.get("materialized_view")
+    ]
+    with db_engine.engine.begin() as connection:
+        for view in views:
+            connection.execute(text(f"REFRESH MATERIALIZED VIEW {view.name}"))
+            logger.info(f"Refreshed {view.name}.")
+
+    if db_engine.result_cache is not None:
+        db_engine.result_cache.bump_version()
+
+
+def select_view(view: Table) -> select:
+    """Select the columns of a materialized view, without the keys of the facts."""
+    return select(
+        *[column for column in view.c if column.name not in ["regio_key", "datum_key"]]
+    )
+
+
+def fetch_view(view: Table, order_by: list[str], db_engine: DBEngine) -> pl.DataFrame:
+    """Fetch a materialized view, from the database or from the parquet files.
+
+    Results are served from the result cache of the engine, when it is enabled.
+    """
+    if db_engine.query_backend == QueryBackend.PARQUET:
+        lf = parquet_queries.scan_view(view=view, parquet_dir=db_engine.parquet_dir)
+        query = f"parquet:{db_engine.parquet_dir.resolve()}:{view.name}:{order_by}"
+
+        def compute() -> pl.DataFrame:
+            return lf.drop(["regio_key", "datum_key"]).sort(order_by).collect()
+
+    else:
+        stmt = select_view(view).order_by(*[view.c[column] for column in order_by])
+        query = compile_stmt(stmt=stmt, db_engine=db_engine)
+
+        def compute() -> pl.DataFrame:
+            return fetch_data(stmt=stmt, db_engine=db_engine, package=DFType.POLARS)
+
+    if db_engine.result_cache is None:
+        return compute()
+    return db_engine.result_cache.get_or_compute(query=query, compute=compute)
+
+
+def get_bevolking_landelijk(_db_engine: DBEngine):
+    df = fetch_view(
+        view=BevolkingLandelijk, order_by=["geslacht", "jaar"], db_engine=_db_engine
+    )
     return df
 
 
 def get_bodemgebruik_landelijk(_db_engine: DBEngine):
-    stmt = (
-        select(
-            Bevolking.bevolking_1_januari,
-            Geslacht.geslacht,
-            Regios.regio,
-            CategoryGroup.catgroup,
-            Burgstaat.burgerlijkestaat,
-            Perioden.jaar,
-            Bodemgebruik,
-        )
-        .join(
-            Geslacht,
-            Bevolking.geslacht_key == Geslacht.geslacht_key,
-        )
-        .join(Perioden, Bevolking.datum_key == Perioden.datum_key)
-        .join(Regios, Bevolking.regio_key == Regios.regio_key)
-        .join(
-            Leeftijd,
-            Bevolking.leeftijd_key == Leeftijd.leeftijd_key,
-        )
-        .join(
-            CategoryGroup,
-            Leeftijd.categorygroupid == CategoryGroup.catgroup_key,
-        )
-        .join(Burgstaat, Bevolking.burgst_key == Burgstaat.burgst_key)
-        .join(
-            Bodemgebruik,
-            (Bevolking.regio_key == Bodemgebruik.regio_key)
-            & (Bevolking.datum_key == Bodemgebruik.datum_key),
-        )
-        .filter(Regios.regio_key == "NL01  ")
-        .filter(CategoryGroup.catgroup == "Totaal")
-        .filter(Burgstaat.burgerlijkestaat == "Totaal burgerlijke staat")
+    df = fetch_view(
+        view=BodemgebruikLandelijk, order_by=["geslacht", "jaar"], db_engine=_db_engine
     )
-
-    df = fetch_data(stmt=stmt, db_engine=_db_engine, package=DFType.POLARS)
-    df = df.drop(["id", "regio_key", "datum_key"])
     return df
 
 
 def get_data_gemeentes(_db_engine: DBEngine):
-    stmt = (
-        select(
-            Bevolking.bevolking_1_januari,
-            Geslacht.geslacht,
-            Regios.regio,
-            CategoryGroup.catgroup,
-            Burgstaat.burgerlijkestaat,
-            Perioden.jaar,
-        )
-        .join(
-            Geslacht,
-            Bevolking.geslacht_key == Geslacht.geslacht_key,
-        )
-        .join(Perioden, Bevolking.datum_key == Perioden.datum_key)
-        .join(Regios, Bevolking.regio_key == Regios.regio_key)
-        .join(
-            Leeftijd,
-            Bevolking.leeftijd_key == Leeftijd.leeftijd_key,
-        )
-        .join(
-            CategoryGroup,
-            Leeftijd.categorygroupid == CategoryGroup.catgroup_key,
-        )
-        .join(Burgstaat, Bevolking.burgst_key == Burgstaat.burgst_key)
-        .filter(Regios.regio_key.startswith("GM"))
-        .filter(CategoryGroup.catgroup == "Totaal")
-        .filter(Burgstaat.burgerlijkestaat == "Totaal burgerlijke staat")
-        .filter(Geslacht.geslacht == "Totaal mannen en vrouwen")
+    df = fetch_view(
+        view=BevolkingGemeentes, order_by=["regio", "jaar"], db_engine=_db_engine
     )
-
-    df = fetch_data(stmt=stmt, db_engine=_db_engine, package=DFType.POLARS)
     return df
 
 
 def get_data_gemeentes_bodemgebruik(_db_engine: DBEngine):
-    stmt = (
-        select(
-            Bevolking.bevolking_1_januari,
-            Geslacht.geslacht,
-            Regios.regio,
-            CategoryGroup.catgroup,
-            Burgstaat.burgerlijkestaat,
-            Perioden.jaar,
-            Bodemgebruik,
-        )
-        .join(
-            Geslacht,
-            Bevolking.geslacht_key == Geslacht.geslacht_key,
-        )
-        .join(Perioden, Bevolking.datum_key == Perioden.datum_key)
-        .join(Regios, Bevolking.regio_key == Regios.regio_key)
-        .join(
-            Leeftijd,
-            Bevolking.leeftijd_key == Leeftijd.leeftijd_key,
-        )
-        .join(
-            CategoryGroup,
-            Leeftijd.categorygroupid == CategoryGroup.catgroup_key,
-        )
-        .join(Burgstaat, Bevolking.burgst_key == Burgstaat.burgst_key)
-        .join(
-            Bodemgebruik,
-            (Bevolking.regio_key == Bodemgebruik.regio_key)
-            & (Bevolking.datum_key == Bodemgebruik.datum_key),
-        )
-        .filter(Regios.regio_key.startswith("GM"))
-        .filter(CategoryGroup.catgroup == "Totaal")
-        .filter(Burgstaat.burgerlijkestaat == "Totaal burgerlijke staat")
-        .filter(Geslacht.geslacht == "Totaal mannen en vrouwen")
+    df = fetch_view(
+        view=BodemgebruikGemeentes, order_by=["regio", "jaar"], db_engine=_db_engine
     )
-
-    df = fetch_data(stmt=stmt, db_engine=_db_engine, package=DFType.POLARS)
-    df = df.drop(["id", "regio_key", "datum_key"])
     return df
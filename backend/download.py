@@ -0,0 +1,163 @@
+import hashlib
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, Union
+
+import polars as pl
+import pyarrow.parquet as pq
+import requests
+from loguru import logger
+
+
+class DownloadManifest:
+    """Append-only record of the $skip pages of a table that are downloaded.
+
+    Every completed page is written as a single JSON line, containing the offset,
+    the number of rows and the checksum of the response. Appending a single short
+    line is atomic, so multiple processes can share one manifest.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def completed(self) -> dict[int, dict]:
+        """Return the completed pages, keyed by their $skip offset."""
+        if not self.path.exists():
+            return {}
+
+        pages = {}
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line can be cut off when a process is killed while writing
+                    logger.warning(f"Skipping corrupt line in {self.path}.")
+                    continue
+                pages[page["offset"]] = page
+        return pages
+
+    def record(self, offset: int, rows: int, checksum: str, **kwargs) -> None:
+        """Mark a page as completed."""
+        page = {"offset": offset, "rows": rows, "checksum": checksum, **kwargs}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(page) + "\n")
+
+
+def stream_content(
+    response: requests.Response, digest: "hashlib._Hash", chunk_size: int = 65536
+) -> Iterator[bytes]:
+    """Iterate over the body of a streamed response, while updating the checksum."""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        digest.update(chunk)
+        yield chunk
+
+
+def fetch_page(
+    url: str, retries: int = 5, backoff: float = 1.0, timeout: float = 60
+) -> requests.Response:
+    """Get a page from CBS Statline API, retrying failed requests with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            response = requests.get(url, stream=True, timeout=timeout)
+            if response.status_code == 200:
+                return response
+            error = f"status code {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+
+        if attempt < retries:
+            wait = backoff * 2**attempt
+            logger.warning(f"Request to {url} failed ({error}), retrying in {wait}s.")
+            time.sleep(wait)
+
+    raise requests.RequestException(
+        f"Request to {url} failed after {retries + 1} attempts ({error})."
+    )
+
+
+class ParquetPartWriter:
+    """Append downloaded pages to a few large parquet files.
+
+    Pages are buffered until a row group is full, and each row group is sorted on
+    `sort_by`, so the row group statistics allow predicate pushdown on those
+    columns. A file is written under a temporary name and only renamed, and its
+    pages recorded in the manifest, once it is closed. A file of a crashed process
+    is therefore never read, and its pages will be downloaded again.
+    """
+
+    def __init__(
+        self,
+        save_dir: Path,
+        prefix: str,
+        manifest: DownloadManifest,
+        sort_by: Union[list[str], None] = None,
+        row_group_size: int = 250000,
+        rows_per_file: int = 5000000,
+        compression: str = "zstd",
+    ):
+        self.save_dir = Path(save_dir)
+        self.prefix = prefix
+        self.manifest = manifest
+        self.sort_by = sort_by or []
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+
+        self.buffer = []
+        self.buffered_rows = 0
+        self.pages = []
+        self.writer = None
+        self.path = None
+        self.file_rows = 0
+
+    def write(self, df: pl.DataFrame, offset: int, checksum: str) -> None:
+        """Add a page to the current file."""
+        self.buffer.append(df)
+        self.buffered_rows += df.height
+        self.pages.append({"offset": offset, "rows": df.height, "checksum": checksum})
+
+        if self.buffered_rows >= self.row_group_size:
+            self.flush()
+        if self.file_rows >= self.rows_per_file:
+            self.close()
+
+    def flush(self) -> None:
+        """Write the buffered pages as a single row group."""
+        if self.buffered_rows == 0:
+            return
+
+        df = pl.concat(self.buffer)
+        if self.sort_by:
+            df = df.sort(self.sort_by)
+        table = df.to_arrow()
+
+        if self.writer is None:
+            self.path = self.save_dir / f"{self.prefix}_{uuid.uuid4().hex[:12]}.parquet"
+            self.writer = pq.ParquetWriter(
+                f"{self.path}.tmp", schema=table.schema, compression=self.compression
+            )
+        self.writer.write_table(table, row_group_size=table.num_rows)
+
+        self.file_rows += df.height
+        self.buffer = []
+        self.buffered_rows = 0
+
+    def close(self) -> None:
+        """Close the current file and mark its pages as completed."""
+        self.flush()
+        if self.writer is None:
+            return
+
+        self.writer.close()
+        Path(f"{self.path}.tmp").rename(self.path)
+        for page in self.pages:
+            self.manifest.record(**page, file=self.path.name)
+        logger.info(f"Written {self.file_rows} rows to {self.path.name}.")
+
+        self.writer = None
+        self.pages = []
+        self.file_rows = 0
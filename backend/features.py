@@ -0,0 +1,101 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+import polars as pl
+from loguru import logger
+from sqlalchemy import func, select
+
+from backend import crud, parquet_queries
+from backend.config import QueryBackend
+from backend.db_tools import DBEngine
+from backend.models import BevolkingGemeentes, BodemgebruikGemeentes
+from backend.utils import growth_columns_by_year
+
+# Columns that describe a row, and are not turned into growth features
+EXCLUDE_COLS = ["regio", "jaar", "geslacht", "catgroup", "burgerlijkestaat"]
+
+TARGET = "bevolking_1_januari_growth"
+
+# The bodemgebruik categories with the highest correlation to the population growth,
+# in the order the models are trained on
+MODEL_FEATURES = [
+    "wegverkeersterrein_growth",
+    "woonterrein_growth",
+    "bedrijventerrein_growth",
+    "begraafplaats_growth",
+    "sportterrein_growth",
+    "volkstuin_growth",
+    "overig_agrarisch_terrein_growth",
+]
+
+
+def build_growth_features(
+    df_bevolking: pl.DataFrame, df_bodem: pl.DataFrame
+) -> pl.DataFrame:
+    """Build the yearly growth of the population and bodemgebruik per gemeente."""
+    # Only use regio's that are in both datasets, and fill null values
+    regios = df_bevolking["regio"].to_list()
+    df = df_bodem.filter(df_bodem["regio"].is_in(regios))
+    # Columns without any value are read from the database as Boolean
+    df = df.with_columns(pl.exclude(EXCLUDE_COLS).cast(pl.Float64))
+    df = df.fill_null(strategy="zero")
+    df = growth_columns_by_year(df=df, columns_to_exclude=EXCLUDE_COLS)
+    df = df[[s.name for s in df if not (s.null_count() == df.height)]]
+    df = df.drop_nulls(TARGET)
+
+    return df.select(
+        [col for col in df.columns if (col in EXCLUDE_COLS) or (col.endswith("growth"))]
+    )
+
+
+def data_version(db_engine: DBEngine) -> str:
+    """Identify the data behind the features by the last period and number of rows."""
+    versions = []
+    for view in [BevolkingGemeentes, BodemgebruikGemeentes]:
+        if db_engine.query_backend == QueryBackend.PARQUET:
+            max_datum_key, count = (
+                parquet_queries.scan_view(view=view, parquet_dir=db_engine.parquet_dir)
+                .select(pl.col("datum_key").max(), pl.count())
+                .collect()
+                .row(0)
+            )
+        else:
+            stmt = select(func.max(view.c.datum_key), func.count()).select_from(view)
+            # Don't keep a transaction open, it would block refreshing the views
+            with db_engine.engine.connect() as connection:
+                max_datum_key, count = connection.execute(stmt).one()
+        versions.append(f"{view.name}:{max_datum_key}:{count}")
+
+    return hashlib.sha256(";".join(versions).encode()).hexdigest()[:16]
+
+
+def load_growth_features(
+    db_engine: DBEngine, version: Union[str, None] = None
+) -> pl.DataFrame:
+    """Load the growth features of the current data, building them if needed.
+
+    The features are stored as an uncompressed Arrow IPC file per data version, and
+    memory mapped when they are loaded. Files of older versions are removed.
+    """
+    version = version or data_version(db_engine)
+    feature_dir = db_engine.feature_dir
+    path = feature_dir / f"growth_features_{version}.arrow"
+
+    if not path.exists():
+        logger.info(f"Building growth features for data version {version}.")
+        df = build_growth_features(
+            df_bevolking=crud.get_data_gemeentes(_db_engine=db_engine),
+            df_bodem=crud.get_data_gemeentes_bodemgebruik(_db_engine=db_engine),
+        )
+
+        feature_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".arrow.tmp")
+        df.write_ipc(tmp_path, compression="uncompressed")
+        tmp_path.rename(path)
+
+        for old_path in feature_dir.glob("growth_features_*.arrow"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+    return pl.read_ipc(path, memory_map=True)
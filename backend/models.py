@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import Column, ForeignKey, Table
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 
 Base = declarative_base()
@@ -257,3 +257,40 @@ class Bodemgebruik(Base):
             "Westerschelde_45": "westerschelde",
             "Noordzee_46": "noordzee",
         }
+
+
+def materialized_view(name: str, columns: list[Column]) -> Table:
+    """Declare a materialized view of data/sql/db_init.sql, with the given columns."""
+    return Table(
+        name,
+        Base.metadata,
+        *[Column(column.name, column.type) for column in columns],
+        info={"materialized_view": True},
+    )
+
+
+# Columns of the joined bevolking facts and dimensions, as selected by the dashboard
+bevolking_view_columns = [
+    Bevolking.__table__.c.regio_key,
+    Bevolking.__table__.c.datum_key,
+    Bevolking.__table__.c.bevolking_1_januari,
+    Geslacht.__table__.c.geslacht,
+    Regios.__table__.c.regio,
+    CategoryGroup.__table__.c.catgroup,
+    Burgstaat.__table__.c.burgerlijkestaat,
+    Perioden.__table__.c.jaar,
+]
+bodemgebruik_view_columns = [
+    column
+    for column in Bodemgebruik.__table__.columns
+    if column.name not in ["id", "regio_key", "datum_key"]
+]
+
+BevolkingLandelijk = materialized_view("mv_bevolking_landelijk", bevolking_view_columns)
+BevolkingGemeentes = materialized_view("mv_bevolking_gemeentes", bevolking_view_columns)
+BodemgebruikLandelijk = materialized_view(
+    "mv_bodemgebruik_landelijk", bevolking_view_columns + bodemgebruik_view_columns
+)
+BodemgebruikGemeentes = materialized_view(
+    "mv_bodemgebruik_gemeentes", bevolking_view_columns + bodemgebruik_view_columns
+)
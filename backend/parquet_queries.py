@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import Union
+
+import polars as pl
+from sqlalchemy import Table
+from sqlalchemy.ext.declarative import DeclarativeMeta
+
+from backend import crud
+from backend.models import (
+    Bevolking,
+    BevolkingGemeentes,
+    BevolkingLandelijk,
+    Bodemgebruik,
+    BodemgebruikGemeentes,
+    BodemgebruikLandelijk,
+    Burgstaat,
+    CategoryGroup,
+    Geslacht,
+    Leeftijd,
+    Perioden,
+    Regios,
+)
+
+# Filters of the materialized views in data/sql/db_init.sql, and whether they include bodemgebruik
+VIEWS = {
+    BevolkingLandelijk.name: (pl.col("regio_key") == "NL01  ", False, False),
+    BevolkingGemeentes.name: (pl.col("regio_key").str.starts_with("GM"), True, False),
+    BodemgebruikLandelijk.name: (pl.col("regio_key") == "NL01  ", False, True),
+    BodemgebruikGemeentes.name: (pl.col("regio_key").str.starts_with("GM"), True, True),
+}
+
+
+def scan_table(
+    table: DeclarativeMeta,
+    parquet_dir: Path,
+    predicate: Union[pl.Expr, None] = None,
+) -> pl.LazyFrame:
+    """Lazily scan the parquet files of a table, cast to the column types of the table.
+
+    Facts are read from all files in `<parquet_dir>/<table>`, dimensions from
+    `<parquet_dir>/dimensions/<table>.parquet`. The predicate is applied to every
+    file before rows that were downloaded more than once are dropped, so it can be
+    pushed down into the scan.
+    """
+    if table in [Bevolking, Bodemgebruik]:
+        files = sorted((Path(parquet_dir) / table.__tablename__).glob("*.parquet"))
+    else:
+        files = [Path(parquet_dir) / "dimensions" / f"{table.__tablename__}.parquet"]
+        files = [file for file in files if file.exists()]
+    if len(files) == 0:
+        raise FileNotFoundError(f"No parquet files found for {table.__tablename__}.")
+
+    frames = []
+    for file in files:
+        lf = pl.scan_parquet(file).select(
+            [
+                pl.col(column).cast(dtype)
+                for column, dtype in crud.table_schema(table).items()
+            ]
+        )
+        if predicate is not None:
+            lf = lf.filter(predicate)
+        frames.append(lf)
+
+    primary_key = table.__table__.primary_key.columns.values()[0].name
+    return pl.concat(frames).unique(subset=primary_key, keep="last")
+
+
+def scan_view(view: Table, parquet_dir: Path) -> pl.LazyFrame:
+    """Build the query of a materialized view over the parquet files."""
+    regio_filter, only_totaal_geslacht, with_bodemgebruik = VIEWS[view.name]
+
+    geslacht = scan_table(Geslacht, parquet_dir).select("geslacht_key", "geslacht")
+    if only_totaal_geslacht:
+        geslacht = geslacht.filter(pl.col("geslacht") == "Totaal mannen en vrouwen")
+    perioden = scan_table(Perioden, parquet_dir).select("datum_key", "jaar")
+    regios = scan_table(Regios, parquet_dir).select("regio_key", "regio")
+    leeftijd = scan_table(Leeftijd, parquet_dir).select(
+        "leeftijd_key", "categorygroupid"
+    )
+    categorygroup = (
+        scan_table(CategoryGroup, parquet_dir)
+        .select("catgroup_key", "catgroup")
+        .filter(pl.col("catgroup") == "Totaal")
+    )
+    burgstaat = (
+        scan_table(Burgstaat, parquet_dir)
+        .select("burgst_key", "burgerlijkestaat")
+        .filter(pl.col("burgerlijkestaat") == "Totaal burgerlijke staat")
+    )
+
+    lf = (
+        scan_table(Bevolking, parquet_dir, predicate=regio_filter)
+        .join(geslacht, on="geslacht_key")
+        .join(perioden, on="datum_key")
+        .join(regios, on="regio_key")
+        .join(leeftijd, on="leeftijd_key")
+        .join(categorygroup, left_on="categorygroupid", right_on="catgroup_key")
+        .join(burgstaat, on="burgst_key")
+    )
+    if with_bodemgebruik:
+        bodemgebruik = scan_table(Bodemgebruik, parquet_dir, predicate=regio_filter)
+        lf = lf.join(
+            bodemgebruik.drop("id"), on=["regio_key", "datum_key"], how="inner"
+        )
+
+    return lf.select([column.name for column in view.c])
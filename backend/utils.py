@@ -1,21 +1,29 @@
+import hashlib
+import queue
 import sys
+import time
 import xml.etree.ElementTree as ET
-from multiprocessing import Process, Value
+from multiprocessing import Process, Queue, Value, current_process
 from pathlib import Path
-import numpy as np
-from typing import Union
+from typing import Iterable, Union
 from sklearn.model_selection import train_test_split
 from joblib import dump
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-import pandas as pd
 import polars as pl
+import pyarrow.parquet as pq
 import requests
 from loguru import logger
 
-from backend.crud import upsert
+from backend.crud import cast_to_table, copy_upsert, upsert
 from backend.db_tools import DBEngine
+from backend.download import (
+    DownloadManifest,
+    ParquetPartWriter,
+    fetch_page,
+    stream_content,
+)
 from backend.models import (
     Bevolking,
     Bodemgebruik,
@@ -27,6 +35,10 @@ from backend.models import (
     Regios,
 )
 
+ATOM_SCHEMA = "{http://www.w3.org/2005/Atom}"
+DATA_SCHEMA = "{http://schemas.microsoft.com/ado/2007/08/dataservices}"
+METADATA_SCHEMA = "{http://schemas.microsoft.com/ado/2007/08/dataservices/metadata}"
+
 
 def parse_response_metadata(
     url: str,
@@ -37,7 +49,7 @@ def parse_response_metadata(
     lijst = []
     response = requests.get(url)
     response_xml = ET.fromstring(response.content)
-    entries = response_xml.findall(".//{http://www.w3.org/2005/Atom}entry")
+    entries = response_xml.findall(f".//{ATOM_SCHEMA}entry")
     for entry in entries:
         for key, value in object.__resp_keys__().items():
             param = find_in_schema(entry=entry, key=key)
@@ -46,54 +58,122 @@ def parse_response_metadata(
     return lijst
 
 
+def download_page(
+    object: Union[Bevolking, Bodemgebruik],
+    url: str,
+    skiprows: int,
+    writer: ParquetPartWriter,
+) -> int:
+    """Download a single $skip page of a typed dataset and add it to a parquet file."""
+    response = fetch_page(f"{url}?$skip={skiprows}")
+    digest = hashlib.sha256()
+    columns = iterparse_properties(
+        chunks=stream_content(response=response, digest=digest),
+        resp_keys=object.__resp_keys__(),
+    )
+    rows = len(columns["id"])
+    if rows == 0:
+        return 0
+
+    # Cast the parsed text to the column types of the table
+    df = pl.DataFrame(columns, schema={column: pl.Utf8 for column in columns})
+    df = cast_to_table(df=df, table=object)
+    writer.write(df=df, offset=skiprows, checksum=digest.hexdigest())
+    return rows
+
+
 def parse_response_typed_dataset(
     chunk_size,
     object: Union[Bevolking, Bodemgebruik],
     url: str,
     total_rows_processed: Value,
+    save_dir: Path,
+    manifest: DownloadManifest,
+    stats_queue: Queue,
 ) -> None:
     """Parse typed datasets XML response from CBS Statline API."""
 
-    row = {}
-    lijst = []
     logger.info(f"Parsing {object.__tablename__}...")
-    save_dir = Path(f"data/parquet/{object.__tablename__}")
-    save_dir.mkdir(parents=True, exist_ok=True)
+    completed = manifest.completed()
+    writer = ParquetPartWriter(
+        save_dir=save_dir,
+        prefix=object.__tablename__.title(),
+        manifest=manifest,
+        sort_by=["regio_key", "datum_key"],
+    )
+    stats = {
+        "worker": current_process().name,
+        "pages": 0,
+        "rows": 0,
+        "failed": [],
+        "end": None,
+    }
+    start = time.perf_counter()
     while True:
         with total_rows_processed.get_lock():
             skiprows = total_rows_processed.value
             total_rows_processed.value += chunk_size
 
-        get_url = f"{url}?$skip={skiprows}"
-        response = requests.get(get_url, stream=True)
-        if response.status_code == 200:
-            response_xml = ET.fromstring(response.content)
-            entries = response_xml.findall(".//{http://www.w3.org/2005/Atom}entry")
-            if len(entries) == 0:
-                logger.info(f"All rows from {object.__tablename__} parsed.")
-                break
-
-            for entry in entries:
-                for key, value in object.__resp_keys__().items():
-                    param = find_in_schema(entry=entry, key=key)
-                    row[value] = param
-                row_dict = object(**row).__dict__
-                row_dict.pop("_sa_instance_state")
-                lijst.append(row_dict)
-
-            skiprows += chunk_size
-            df = pd.DataFrame.from_dict(lijst)
-            df.to_parquet(
-                f"data/parquet/{object.__tablename__}/{object.__tablename__.title()}_{skiprows}.parquet"
+        # Pages from an earlier, interrupted run don't have to be downloaded again
+        if skiprows in completed:
+            continue
+
+        try:
+            rows = download_page(
+                object=object, url=url, skiprows=skiprows, writer=writer
             )
-            lijst = []
-            logger.info(f"Parsed {skiprows} rows.")
+        except requests.RequestException as e:
+            logger.error(f"Skipping $skip={skiprows}: {e}")
+            stats["failed"].append(skiprows)
+            continue
+
+        if rows == 0:
+            logger.info(f"All rows from {object.__tablename__} parsed.")
+            stats["end"] = skiprows
+            break
+
+        stats["pages"] += 1
+        stats["rows"] += rows
+        logger.info(f"Parsed {skiprows + chunk_size} rows.")
+
+    writer.close()
+    stats["seconds"] = time.perf_counter() - start
+    stats_queue.put(stats)
+
+
+def iterparse_properties(
+    chunks: Iterable[bytes], resp_keys: dict[str, str]
+) -> dict[str, list[Union[str, None]]]:
+    """Incrementally parse the entries of an OData feed into columns.
+
+    The children of every m:properties element are resolved in a single pass, and
+    parsed entries are cleared right away, so memory stays bounded regardless of
+    the size of the response.
+    """
+    tags = {f"{DATA_SCHEMA}{key}": value for key, value in resp_keys.items()}
+    columns = {value: [] for value in resp_keys.values()}
+    parser = ET.XMLPullParser(events=("end",))
+
+    def collect():
+        for _, elem in parser.read_events():
+            if elem.tag == f"{METADATA_SCHEMA}properties":
+                row = {child.tag: child.text for child in elem}
+                for tag, value in tags.items():
+                    columns[value].append(row.get(tag))
+            elif elem.tag == f"{ATOM_SCHEMA}entry":
+                elem.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        collect()
+    parser.close()
+    collect()
+    return columns
 
 
 def find_in_schema(entry: ET.Element, key: str) -> Union[str, None]:
     """Find key in schema."""
-    schema = "{http://schemas.microsoft.com/ado/2007/08/dataservices}"
-    param = entry.find(f".//{schema}{key}")
+    param = entry.find(f".//{DATA_SCHEMA}{key}")
     if param is None:
         return None
     return param.text
@@ -114,6 +194,7 @@ def get_metadata_from_cbs(
             Leeftijd,
         ],
     ],
+    save_dir: Union[Path, None] = None,
 ) -> None:
     # Get data from CBS Statline API and upsert into database
 
@@ -124,24 +205,67 @@ def get_metadata_from_cbs(
         )
         upsert(db_engine=db_engine, table=value, data=data)
         logger.info(f"Upserted {len(data)} records into {key}.")
+
+        # Also keep the dimensions as parquet file, for the parquet query backend
+        if save_dir is not None:
+            save_dimension(data=data, object=value, save_dir=save_dir)
     logger.info("Done!")
 
 
+def save_dimension(
+    data: list[Union[Burgstaat, CategoryGroup, Geslacht, Leeftijd, Perioden, Regios]],
+    object: Union[Burgstaat, CategoryGroup, Geslacht, Leeftijd, Perioden, Regios],
+    save_dir: Path,
+) -> None:
+    """Save the parsed rows of a dimension to <save_dir>/dimensions/<table>.parquet."""
+    columns = object.__table__.columns.keys()
+    df = pl.DataFrame(
+        [[getattr(row, column) for column in columns] for row in data],
+        schema={column: pl.Utf8 for column in columns},
+        orient="row",
+    )
+    dimension_dir = Path(save_dir) / "dimensions"
+    dimension_dir.mkdir(parents=True, exist_ok=True)
+    cast_to_table(df=df, table=object).write_parquet(
+        dimension_dir / f"{object.__tablename__}.parquet"
+    )
+
+
 def get_data_from_cbs(
-    object: Union[Bevolking, Bodemgebruik], url: str, num_processes: int = 4
-):
+    object: Union[Bevolking, Bodemgebruik],
+    url: str,
+    num_processes: int = 4,
+    chunk_size: int = 10000,
+    save_dir: Path = Path("data/parquet"),
+) -> None:
     # Get data from CBS Statline API and save as parquet files due to the large size
-    chunk_size = 10000  # Size of each data chunk
+    table_dir = Path(save_dir) / object.__tablename__
+    table_dir.mkdir(parents=True, exist_ok=True)
+    manifest = DownloadManifest(
+        Path(save_dir) / f"{object.__tablename__}.manifest.jsonl"
+    )
+    logger.info(
+        f"Found {len(manifest.completed())} completed pages of {object.__tablename__}."
+    )
 
     # Create a list of processes
     processes = []
     logger.info(f"Starting {num_processes} processes...")
     total_rows_processed = Value("i", 0)
+    stats_queue = Queue()
     for i in range(num_processes):
         # Create a new process and start it
         process = Process(
             target=parse_response_typed_dataset,
-            args=(chunk_size, object, url, total_rows_processed),
+            args=(
+                chunk_size,
+                object,
+                url,
+                total_rows_processed,
+                table_dir,
+                manifest,
+                stats_queue,
+            ),
         )
         processes.append(process)
         process.start()
@@ -149,6 +273,50 @@ def get_data_from_cbs(
     # Wait for all processes to finish
     for process in processes:
         process.join()
+        if process.exitcode != 0:
+            logger.warning(f"{process.name} exited with code {process.exitcode}.")
+
+    worker_stats = []
+    while True:
+        try:
+            worker_stats.append(stats_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    for stats in worker_stats:
+        logger.info(
+            f"{stats['worker']}: {stats['pages']} pages, {stats['rows']} rows in "
+            f"{stats['seconds']:.1f}s ({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/sec)."
+        )
+
+    # Pages of failed requests or crashed processes are retried once more, the
+    # remaining gaps will be picked up by the next run
+    ends = [stats["end"] for stats in worker_stats if stats["end"] is not None]
+    if len(ends) == 0:
+        logger.warning(
+            f"End of {object.__tablename__} not reached, rerun to resume the download."
+        )
+        return
+
+    completed = manifest.completed()
+    missing = [
+        skiprows
+        for skiprows in range(0, min(ends), chunk_size)
+        if skiprows not in completed
+    ]
+    writer = ParquetPartWriter(
+        save_dir=table_dir,
+        prefix=object.__tablename__.title(),
+        manifest=manifest,
+        sort_by=["regio_key", "datum_key"],
+    )
+    for skiprows in missing:
+        logger.info(f"Retrying $skip={skiprows}...")
+        try:
+            download_page(object=object, url=url, skiprows=skiprows, writer=writer)
+        except requests.RequestException as e:
+            logger.error(f"Failed to download $skip={skiprows}, rerun to resume: {e}")
+    writer.close()
 
 
 def parse_parquet_to_db(
@@ -156,8 +324,20 @@ def parse_parquet_to_db(
     object: Union[Bevolking, Bodemgebruik],
     db_engine: DBEngine,
     regios: pl.Series,
-):
+    bulk: bool = False,
+) -> int:
     # Parse parquet files and upsert into database
+    if bulk:
+        # Load one row group at a time, cast to the column types of the table and COPY it as a whole
+        parquet_file = pq.ParquetFile(path)
+        rows = 0
+        for i in range(parquet_file.num_row_groups):
+            df = pl.from_arrow(parquet_file.read_row_group(i))
+            df = df.filter(pl.col("regio_key").is_in(regios))
+            df = cast_to_table(df=df, table=object)
+            rows += copy_upsert(db_engine=db_engine, table=object, df=df)
+        return rows
+
     df = pl.read_parquet(path)
     df = df.cast(pl.Utf8)
 
@@ -168,31 +348,58 @@ def parse_parquet_to_db(
     list_of_objects = [object(**row) for row in list_of_dict]
 
     upsert(db_engine=db_engine, table=object, data=list_of_objects)
+    return len(list_of_objects)
 
 
 def growth_columns_by_year(
     df: pl.DataFrame, columns_to_exclude: list[str]
 ) -> pl.DataFrame:
+    """Add the value of the previous year and the growth since then, for every column.
+
+    All columns are computed in a single lazy plan. The previous moment is taken
+    within each regio in order of jaar, while the input order of the rows is kept.
+    Growth that is NaN or infinite, due to a previous value of 0, is set to 0.
+    """
     use_cols = [col for col in df.columns if col not in columns_to_exclude]
 
-    for column in use_cols:
-        df = df.with_columns(
-            (pl.col(column).shift(1)).over("regio").alias(f"{column}_previous_moment")
-        )
-        df = df.with_columns(
-            (
-                (pl.col(column) - pl.col(f"{column}_previous_moment"))
-                / pl.col(f"{column}_previous_moment")
-            ).alias(f"{column}_growth")
-        )
-        df = df.fill_nan(0)
-
-    # The following code is needed to replace inf values with 0, because of a bug in Polars.
-    # We will replace them using pandas, and convert the dataframe back to polars before returning the dataframe
-    df_pd = df.to_pandas()
-    df_pd.replace([np.inf, -np.inf], 0, inplace=True)
-    df = pl.from_pandas(df_pd)
-    return df
+    previous_moment = [
+        pl.col(column).shift(1).over("regio").alias(f"{column}_previous_moment")
+        for column in use_cols
+    ]
+    growth = [
+        (
+            (pl.col(column) - pl.col(f"{column}_previous_moment"))
+            / pl.col(f"{column}_previous_moment")
+        ).alias(f"{column}_growth")
+        for column in use_cols
+    ]
+
+    lf = (
+        df.lazy()
+        .with_row_count("row_nr")
+        .sort(["regio", "jaar"])
+        .with_columns(previous_moment)
+        .with_columns(growth)
+    )
+    float_cols = [
+        column for column, dtype in lf.schema.items() if dtype in pl.FLOAT_DTYPES
+    ]
+    lf = lf.with_columns(
+        [
+            pl.when(pl.col(column).is_nan() | pl.col(column).is_infinite())
+            .then(0.0)
+            .otherwise(pl.col(column))
+            .alias(column)
+            for column in float_cols
+        ]
+    )
+
+    new_cols = [
+        name
+        for column in use_cols
+        for name in [f"{column}_previous_moment", f"{column}_growth"]
+    ]
+    return lf.sort("row_nr").select(df.columns + new_cols).collect()
 
 
 def train_models(X, y, models: dict[str, object]) -> None:
@@ -0,0 +1,181 @@
+-- Materialized views for databases created before they were part of db_init.sql
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_bevolking_landelijk AS
+SELECT
+    b.regio_key,
+    b.datum_key,
+    b.bevolking_1_januari,
+    g.geslacht,
+    r.regio,
+    c.catgroup,
+    bs.burgerlijkestaat,
+    p.jaar
+FROM bevolking b
+    JOIN geslacht g ON b.geslacht_key = g.geslacht_key
+    JOIN perioden p ON b.datum_key = p.datum_key
+    JOIN regios r ON b.regio_key = r.regio_key
+    JOIN leeftijd l ON b.leeftijd_key = l.leeftijd_key
+    JOIN categorygroup c ON l.categorygroupid = c.catgroup_key
+    JOIN burgstaat bs ON b.burgst_key = bs.burgst_key
+WHERE b.regio_key = 'NL01  '
+    AND c.catgroup = 'Totaal'
+    AND bs.burgerlijkestaat = 'Totaal burgerlijke staat';
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_bevolking_gemeentes AS
+SELECT
+    b.regio_key,
+    b.datum_key,
+    b.bevolking_1_januari,
+    g.geslacht,
+    r.regio,
+    c.catgroup,
+    bs.burgerlijkestaat,
+    p.jaar
+FROM bevolking b
+    JOIN geslacht g ON b.geslacht_key = g.geslacht_key
+    JOIN perioden p ON b.datum_key = p.datum_key
+    JOIN regios r ON b.regio_key = r.regio_key
+    JOIN leeftijd l ON b.leeftijd_key = l.leeftijd_key
+    JOIN categorygroup c ON l.categorygroupid = c.catgroup_key
+    JOIN burgstaat bs ON b.burgst_key = bs.burgst_key
+WHERE b.regio_key LIKE 'GM%'
+    AND c.catgroup = 'Totaal'
+    AND bs.burgerlijkestaat = 'Totaal burgerlijke staat'
+    AND g.geslacht = 'Totaal mannen en vrouwen';
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_bodemgebruik_landelijk AS
+SELECT
+    b.regio_key,
+    b.datum_key,
+    b.bevolking_1_januari,
+    g.geslacht,
+    r.regio,
+    c.catgroup,
+    bs.burgerlijkestaat,
+    p.jaar,
+    bg.totale_oppervlakte,
+    bg.totaal_verkeersterrein,
+    bg.spoorterrein,
+    bg.wegverkeersterrein,
+    bg.vliegveld,
+    bg.totaal_bebouwd_terrein,
+    bg.woonterrein,
+    bg.terrein_voor_detailhandel_en_horeca,
+    bg.terrein_voor_openbare_voorzieningen,
+    bg.terrein_voor_sociaal_culturele_voorz,
+    bg.bedrijventerrein,
+    bg.totaal_semi_bebouwd_terrein,
+    bg.stortplaats,
+    bg.wrakkenopslagplaats,
+    bg.begraafplaats,
+    bg.delfstofwinplaats,
+    bg.bouwterrein,
+    bg.semi_verhard_overig_terrein,
+    bg.totaal_recreatieterrein,
+    bg.park_en_plantsoen,
+    bg.sportterrein,
+    bg.volkstuin,
+    bg.dagrecreatief_terrein,
+    bg.verblijfsrecreatief_terrein,
+    bg.totaal_agrarisch_terrein,
+    bg.terrein_voor_glastuinbouw,
+    bg.overig_agrarisch_terrein,
+    bg.totaal_bos_en_open_natuurlijk_terrein,
+    bg.bos,
+    bg.open_droog_natuurlijk_terrein,
+    bg.open_nat_natuurlijk_terrein,
+    bg.totaal_binnenwater,
+    bg.ijsselmeer_markermeer,
+    bg.afgesloten_zeearm,
+    bg.rijn_en_maas,
+    bg.randmeer,
+    bg.spaarbekken,
+    bg.recreatief_binnenwater,
+    bg.binnenwater_voor_delfstofwinning,
+    bg.vloei_en_of_slibveld,
+    bg.overig_binnenwater,
+    bg.totaal_buitenwater,
+    bg.waddenzee_eems_dollard,
+    bg.oosterschelde,
+    bg.westerschelde,
+    bg.noordzee
+FROM bevolking b
+    JOIN geslacht g ON b.geslacht_key = g.geslacht_key
+    JOIN perioden p ON b.datum_key = p.datum_key
+    JOIN regios r ON b.regio_key = r.regio_key
+    JOIN leeftijd l ON b.leeftijd_key = l.leeftijd_key
+    JOIN categorygroup c ON l.categorygroupid = c.catgroup_key
+    JOIN burgstaat bs ON b.burgst_key = bs.burgst_key
+    JOIN bodemgebruik bg ON b.regio_key = bg.regio_key AND b.datum_key = bg.datum_key
+WHERE b.regio_key = 'NL01  '
+    AND c.catgroup = 'Totaal'
+    AND bs.burgerlijkestaat = 'Totaal burgerlijke staat';
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_bodemgebruik_gemeentes AS
+SELECT
+    b.regio_key,
+    b.datum_key,
+    b.bevolking_1_januari,
+    g.geslacht,
+    r.regio,
+    c.catgroup,
+    bs.burgerlijkestaat,
+    p.jaar,
+    bg.totale_oppervlakte,
+    bg.totaal_verkeersterrein,
+    bg.spoorterrein,
+    bg.wegverkeersterrein,
+    bg.vliegveld,
+    bg.totaal_bebouwd_terrein,
+    bg.woonterrein,
+    bg.terrein_voor_detailhandel_en_horeca,
+    bg.terrein_voor_openbare_voorzieningen,
+    bg.terrein_voor_sociaal_culturele_voorz,
+    bg.bedrijventerrein,
+    bg.totaal_semi_bebouwd_terrein,
+    bg.stortplaats,
+    bg.wrakkenopslagplaats,
+    bg.begraafplaats,
+    bg.delfstofwinplaats,
+    bg.bouwterrein,
+    bg.semi_verhard_overig_terrein,
+    bg.totaal_recreatieterrein,
+    bg.park_en_plantsoen,
+    bg.sportterrein,
+    bg.volkstuin,
+    bg.dagrecreatief_terrein,
+    bg.verblijfsrecreatief_terrein,
+    bg.totaal_agrarisch_terrein,
+    bg.terrein_voor_glastuinbouw,
+    bg.overig_agrarisch_terrein,
+    bg.totaal_bos_en_open_natuurlijk_terrein,
+    bg.bos,
+    bg.open_droog_natuurlijk_terrein,
+    bg.open_nat_natuurlijk_terrein,
+    bg.totaal_binnenwater,
+    bg.ijsselmeer_markermeer,
+    bg.afgesloten_zeearm,
+    bg.rijn_en_maas,
+    bg.randmeer,
+    bg.spaarbekken,
+    bg.recreatief_binnenwater,
+    bg.binnenwater_voor_delfstofwinning,
+    bg.vloei_en_of_slibveld,
+    bg.overig_binnenwater,
+    bg.totaal_buitenwater,
+    bg.waddenzee_eems_dollard,
+    bg.oosterschelde,
+    bg.westerschelde,
+    bg.noordzee
+FROM bevolking b
+    JOIN geslacht g ON b.geslacht_key = g.geslacht_key
+    JOIN perioden p ON b.datum_key = p.datum_key
+    JOIN regios r ON b.regio_key = r.regio_key
+    JOIN leeftijd l ON b.leeftijd_key = l.leeftijd_key
+    JOIN categorygroup c ON l.categorygroupid = c.catgroup_key
+    JOIN burgstaat bs ON b.burgst_key = bs.burgst_key
+    JOIN bodemgebruik bg ON b.regio_key = bg.regio_key AND b.datum_key = bg.datum_key
+WHERE b.regio_key LIKE 'GM%'
+    AND c.catgroup = 'Totaal'
+    AND bs.burgerlijkestaat = 'Totaal burgerlijke staat'
+    AND g.geslacht = 'Totaal mannen en vrouwen';
+CREATE INDEX IF NOT EXISTS idx_mv_bevolking_landelijk ON mv_bevolking_landelijk(geslacht, jaar);
+CREATE INDEX IF NOT EXISTS idx_mv_bevolking_gemeentes ON mv_bevolking_gemeentes(regio, jaar);
+CREATE INDEX IF NOT EXISTS idx_mv_bodemgebruik_landelijk ON mv_bodemgebruik_landelijk(geslacht, jaar);
+CREATE INDEX IF NOT EXISTS idx_mv_bodemgebruik_gemeentes ON mv_bodemgebruik_gemeentes(regio, jaar);
@@ -0,0 +1,7 @@
+-- Composite and partial indexes for databases created before they were part of db_init.sql
+CREATE INDEX IF NOT EXISTS idx_bevolking_gemeentes ON bevolking(geslacht_key, burgst_key, leeftijd_key, regio_key, datum_key) INCLUDE (bevolking_1_januari) WHERE regio_key LIKE 'GM%';
+CREATE INDEX IF NOT EXISTS idx_bevolking_landelijk ON bevolking(geslacht_key, burgst_key, leeftijd_key, datum_key) INCLUDE (bevolking_1_januari) WHERE regio_key = 'NL01  ';
+CREATE INDEX IF NOT EXISTS idx_bevolking_regio_datum ON bevolking(regio_key, datum_key);
+CREATE INDEX IF NOT EXISTS idx_bodemgebruik_regio_datum ON bodemgebruik(regio_key, datum_key);
+DROP INDEX IF EXISTS idx_bevolking_regio_key;
+DROP INDEX IF EXISTS idx_bodemgebruik_regio_key;
@@ -1,3 +1,4 @@
+import time
 from pathlib import Path
 
 import click
@@ -6,8 +7,9 @@ from tqdm import tqdm
 from sklearn import linear_model, svm, tree, kernel_ridge
 
 from backend.config import Settings
-from backend import crud, utils
+from backend import crud
 from backend.db_tools import DBEngine
+from backend.features import MODEL_FEATURES, TARGET, load_growth_features
 from backend.models import (
     Bevolking,
     Bodemgebruik,
@@ -40,10 +42,21 @@ from backend.utils import (
     default="",
     help="Path to folder with parquet files to process and upsert into database.",
 )
+@click.option(
+    "--bulk-load",
+    is_flag=True,
+    help="Load parquet files through PostgreSQL COPY and a set-based merge, instead of the ORM upsert.",
+)
 @click.option(
     "--setup-models", is_flag=True, help="Train models and save to ml_models folder."
 )
-def main(callapi: bool, num_processes: int, process_parquet: str, setup_models: bool):
+def main(
+    callapi: bool,
+    num_processes: int,
+    process_parquet: str,
+    bulk_load: bool,
+    setup_models: bool,
+):
     # Connect to database and create engine
     db_engine = DBEngine(**Settings().model_dump())
 
@@ -58,19 +71,27 @@ def main(callapi: bool, num_processes: int, process_parquet: str, setup_models:
             "RegioS": Regios,
         }
 
-        get_metadata_from_cbs(db_engine=db_engine, models_dict=models_dict)
+        get_metadata_from_cbs(
+            db_engine=db_engine, models_dict=models_dict, save_dir=db_engine.parquet_dir
+        )
         # Get data from CBS Statline API and save as parquet files
         get_data_from_cbs(
             object=Bodemgebruik,
             url="https://opendata.cbs.nl/ODataFeed/odata/70262ned/TypedDataSet",
             num_processes=num_processes,
+            save_dir=db_engine.parquet_dir,
         )
         get_data_from_cbs(
             object=Bevolking,
             url="https://opendata.cbs.nl/ODataFeed/odata/03759ned/TypedDataSet",
             num_processes=num_processes,
+            save_dir=db_engine.parquet_dir,
         )
 
+        # Results of the parquet query backend are outdated by the new files
+        if db_engine.result_cache is not None:
+            db_engine.result_cache.bump_version()
+
     if process_parquet != "":
         # Get regio keys from database
         regios = crud.select_table_from_db(db_engine=db_engine, table=Regios)
@@ -85,63 +106,37 @@ def main(callapi: bool, num_processes: int, process_parquet: str, setup_models:
             parquetFiles = folder.rglob("*.parquet")
             nrows = len(list(parquetFiles))
             logger.info(f"Found {nrows} parquet files in {folder}.")
+            total_rows = 0
+            start = time.perf_counter()
             for file in tqdm(folder.iterdir(), total=nrows):
                 if file.suffix == ".parquet":
-                    parse_parquet_to_db(
-                        path=file, object=object, db_engine=db_engine, regios=regio_keys
+                    total_rows += parse_parquet_to_db(
+                        path=file,
+                        object=object,
+                        db_engine=db_engine,
+                        regios=regio_keys,
+                        bulk=bulk_load,
                     )
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Loaded {total_rows} rows into {object.__tablename__} in {elapsed:.1f}s "
+                f"({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)."
+            )
+
+        # Refresh the pre-joined views that are read by the dashboard
+        crud.refresh_materialized_views(db_engine=db_engine)
 
     if setup_models:
         # Train models and save them to the ml_models folder
-        df_bevolking = crud.get_data_gemeentes(_db_engine=db_engine)
-        df_bodem = crud.get_data_gemeentes_bodemgebruik(_db_engine=db_engine)
-
-        # Preprocessing of data, such as only using regio's that are in both datasets, and filling null values
-        regios = df_bevolking["regio"].to_list()
-        exclude_cols = ["regio", "jaar", "geslacht", "catgroup", "burgerlijkestaat"]
-        devdf_bodem = df_bodem.filter(df_bodem["regio"].is_in(regios))
-        devdf_bodem = devdf_bodem.fill_null(strategy="zero")
-        devdf_bodem = utils.growth_columns_by_year(
-            df=devdf_bodem, columns_to_exclude=exclude_cols
-        )
-        devdf_bodem = devdf_bodem[
-            [s.name for s in devdf_bodem if not (s.null_count() == devdf_bodem.height)]
-        ]
-        devdf_bodem = devdf_bodem.drop_nulls("bevolking_1_januari_growth")
-
-        devdf_bodem = devdf_bodem.select(
-            [
-                col
-                for col in devdf_bodem.columns
-                if (col in exclude_cols) or (col.endswith("growth"))
-            ]
-        )
+        features = load_growth_features(db_engine=db_engine)
 
-        # Use a clone of the data for model training, and pick the features with the highest correlations
-        include_cols = [
-            "wegverkeersterrein_growth",
-            "woonterrein_growth",
-            "bedrijventerrein_growth",
-            "begraafplaats_growth",
-            "sportterrein_growth",
-            "volkstuin_growth",
-            "overig_agrarisch_terrein_growth",
-            "jaar",
-            "bevolking_1_januari_growth",
-        ]
-        model_df = devdf_bodem.clone().select(include_cols).to_pandas()
+        # Use the features with the highest correlations
+        model_df = features.select([*MODEL_FEATURES, "jaar", TARGET]).to_pandas()
         model_df.set_index("jaar", inplace=True)
 
         # Split the data into train and test sets
-        X = model_df[
-            [
-                col
-                for col in model_df.columns
-                if col not in ["bevolking_1_januari_growth", "jaar"]
-            ]
-        ]
-
-        y = model_df["bevolking_1_januari_growth"]
+        X = model_df[MODEL_FEATURES]
+        y = model_df[TARGET]
         models = {
             "LinearRegression": linear_model.LinearRegression(),
             "SVM": svm.SVR(),
@@ -0,0 +1,74 @@
+"""
+Microbenchmark of growth_columns_by_year, on a synthetic frame of gemeentes by year.
+
+Run from the root of the project:
+    pdm run python tests/bench_growth_columns.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.utils import growth_columns_by_year
+
+GEMEENTES = 400
+YEARS = 40
+COLUMNS = 50
+REPEAT = 3
+
+
+def build_frame(gemeentes: int, years: int, columns: int) -> pl.DataFrame:
+    # Include zeros, so growth from a previous value of 0 gives NaN and inf
+    rng = np.random.default_rng(0)
+    rows = gemeentes * years
+    data = {
+        "regio": np.repeat([f"Gemeente {i}" for i in range(gemeentes)], years),
+        "jaar": np.tile(np.arange(2023 - years, 2023), gemeentes),
+    }
+    for i in range(columns):
+        data[f"column_{i}"] = rng.integers(0, 5, rows) * 1.0
+    return pl.DataFrame(data)
+
+
+def growth_columns_by_year_loop(
+    df: pl.DataFrame, columns_to_exclude: list[str]
+) -> pl.DataFrame:
+    # Previous implementation: two passes over the frame per column, and a round
+    # trip through pandas to replace inf
+    use_cols = [col for col in df.columns if col not in columns_to_exclude]
+
+    for column in use_cols:
+        df = df.with_columns(
+            (pl.col(column).shift(1)).over("regio").alias(f"{column}_previous_moment")
+        )
+        df = df.with_columns(
+            (
+                (pl.col(column) - pl.col(f"{column}_previous_moment"))
+                / pl.col(f"{column}_previous_moment")
+            ).alias(f"{column}_growth")
+        )
+        df = df.fill_nan(0)
+
+    df_pd = df.to_pandas()
+    df_pd.replace([np.inf, -np.inf], 0, inplace=True)
+    return pl.from_pandas(df_pd)
+
+
+def measure(name: str, func, df: pl.DataFrame) -> None:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(df, columns_to_exclude=["regio", "jaar"])
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<8} best {min(timings) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    df = build_frame(GEMEENTES, YEARS, COLUMNS)
+    print(f"{GEMEENTES} gemeentes x {YEARS} years x {COLUMNS} columns")
+    measure("loop", growth_columns_by_year_loop, df)
+    measure("lazy", growth_columns_by_year, df)
@@ -0,0 +1,72 @@
+"""
+Microbenchmark of the TypedDataSet parsers, on a page built from tests/test_data.
+
+Run from the root of the project:
+    pdm run python tests/bench_parse_typed_dataset.py
+"""
+import re
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.models import Bevolking
+from backend.utils import find_in_schema, iterparse_properties
+
+PAGE_SIZE = 10000
+REPEAT = 5
+
+
+def build_page(page_size: int) -> bytes:
+    # Repeat the entries of the fixture until the page is as large as a CBS page
+    content = (Path(__file__).parent / "test_data" / "bevolking.xml").read_text()
+    entries = re.findall(r"  <entry>.*?</entry>\n", content, flags=re.DOTALL)
+    header = content[: content.index("  <entry>")]
+    body = [entries[i % len(entries)] for i in range(page_size)]
+    return (header + "".join(body) + "</feed>").encode()
+
+
+def parse_tree(content: bytes) -> list[dict]:
+    # Previous implementation: build the whole tree and search every key per entry
+    rows = []
+    response_xml = ET.fromstring(content)
+    entries = response_xml.findall(".//{http://www.w3.org/2005/Atom}entry")
+    for entry in entries:
+        row = {}
+        for key, value in Bevolking.__resp_keys__().items():
+            row[value] = find_in_schema(entry=entry, key=key)
+        rows.append(row)
+    return rows
+
+
+def parse_stream(content: bytes) -> dict[str, list]:
+    chunks = (content[i : i + 65536] for i in range(0, len(content), 65536))
+    return iterparse_properties(chunks=chunks, resp_keys=Bevolking.__resp_keys__())
+
+
+def measure(name: str, func, content: bytes) -> None:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:<10} best {min(timings) * 1000:8.1f} ms   "
+        f"{PAGE_SIZE / min(timings):10,.0f} rows/sec   peak {peak / 2**20:6.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    content = build_page(PAGE_SIZE)
+    print(f"Page of {PAGE_SIZE} entries, {len(content) / 2**20:.1f} MiB")
+    measure("tree", parse_tree, content)
+    measure("iterparse", parse_stream, content)
@@ -1,6 +1,9 @@
 import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 
 import psycopg2
 import pytest
@@ -18,7 +21,7 @@ class PGTestContainer(PostgresContainer):
 
 
 @pytest.fixture(scope="session", autouse=True)
-def postgresql_connection():
+def postgresql_connection(tmp_path_factory):
     # Will be executed before the first test
     pg_container = PGTestContainer(image="postgres:15.4")
 
@@ -31,6 +34,7 @@ def postgresql_connection():
     os.environ["DBUSER"] = conn.username
     os.environ["DBPASS"] = conn.password
     os.environ["DBNAME"] = conn.path[1:]
+    os.environ["CACHE_DIR"] = str(tmp_path_factory.mktemp("cache"))
 
     with psycopg2.connect(
         host=conn.hostname,
@@ -53,3 +57,145 @@ def init_db(postgresql_connection):
         cursor.execute(open(init_db_path, "r").read())
 
     postgresql_connection.commit()
+
+
+@pytest.fixture(scope="session")
+def db_engine(init_db):
+    from backend.config import Settings
+    from backend.db_tools import DBEngine
+
+    return DBEngine(**Settings().model_dump())
+
+
+# Minimal set of dimensions, used by the tests that load facts into the database
+@pytest.fixture(scope="session")
+def seed_dimensions(db_engine):
+    from backend import crud, models
+
+    dimensions = {
+        models.CategoryGroup: [
+            models.CategoryGroup(
+                catgroup_key=1, dimensionkey="Leeftijd", catgroup="Totaal"
+            )
+        ],
+        models.Leeftijd: [
+            models.Leeftijd(leeftijd_key=10000, leeftijd="Totaal", categorygroupid=1)
+        ],
+        models.Geslacht: [
+            models.Geslacht(
+                geslacht_key="T001038", geslacht="Totaal mannen en vrouwen"
+            ),
+            models.Geslacht(geslacht_key="3000   ", geslacht="Mannen"),
+            models.Geslacht(geslacht_key="4000   ", geslacht="Vrouwen"),
+        ],
+        models.Burgstaat: [
+            models.Burgstaat(
+                burgst_key="T001019", burgerlijkestaat="Totaal burgerlijke staat"
+            )
+        ],
+        models.Regios: [
+            models.Regios(regio_key="NL01  ", regio="Nederland"),
+            models.Regios(regio_key="GM0014", regio="Groningen"),
+            models.Regios(regio_key="GM0034", regio="Almere"),
+        ],
+        models.Perioden: [
+            models.Perioden(datum_key=f"{jaar}JJ00", jaar=jaar, status="Definitief")
+            for jaar in range(2020, 2024)
+        ],
+    }
+    for table, data in dimensions.items():
+        crud.upsert(db_engine=db_engine, table=table, data=data)
+
+
+class CBSStandIn(ThreadingHTTPServer):
+    """
+    Local stand-in for the CBS OData feed, serving the XML files in tests/test_data.
+    TypedDataSets are paged by $skip, like the real API does.
+    """
+
+    feeds = {
+        "/ODataFeed/odata/03759ned/BurgerlijkeStaat": "burgstaat.xml",
+        "/ODataFeed/odata/03759ned/TypedDataSet": "bevolking.xml",
+    }
+
+    def __init__(self, page_size: int):
+        super().__init__(("127.0.0.1", 0), CBSRequestHandler)
+        self.page_size = page_size
+        self.requests = []
+        self.fail_once = set()
+        self.url = f"http://127.0.0.1:{self.server_port}/ODataFeed/odata"
+
+    def page(self, path: str, skip: int) -> bytes:
+        content = (Path(__file__).parent / "test_data" / self.feeds[path]).read_text()
+        if not path.endswith("TypedDataSet"):
+            return content.encode()
+
+        entries = re.findall(r"  <entry>.*?</entry>\n", content, flags=re.DOTALL)
+        header = content[: content.index("  <entry>")]
+        page = entries[skip : skip + self.page_size]
+        return (header + "".join(page) + "</feed>").encode()
+
+
+class CBSRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        skip = int(parse_qs(url.query).get("$skip", ["0"])[0])
+        self.server.requests.append((url.path, skip))
+
+        if (url.path, skip) in self.server.fail_once:
+            self.server.fail_once.remove((url.path, skip))
+            self.send_response(503)
+            self.end_headers()
+            return
+        if url.path not in self.server.feeds:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = self.server.page(url.path, skip)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def cbs_server():
+    server = CBSStandIn(page_size=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+# Facts of tests/test_data/bevolking.xml plus a few rows of bodemgebruik
+@pytest.fixture(scope="session")
+def seed_facts(db_engine, seed_dimensions):
+    import polars as pl
+
+    from backend import crud, models
+    from backend.utils import iterparse_properties
+
+    with open(Path(__file__).parent / "test_data" / "bevolking.xml", "rb") as f:
+        columns = iterparse_properties(
+            chunks=[f.read()], resp_keys=models.Bevolking.__resp_keys__()
+        )
+    bevolking = crud.cast_to_table(df=pl.DataFrame(columns), table=models.Bevolking)
+    crud.copy_upsert(db_engine=db_engine, table=models.Bevolking, df=bevolking)
+
+    bodemgebruik = pl.DataFrame(
+        {
+            "id": [0, 1, 2, 3, 4, 5],
+            "regio_key": ["NL01  ", "NL01  ", "GM0014", "GM0014", "GM0034", "GM0034"],
+            "datum_key": ["2022JJ00", "2023JJ00"] * 3,
+            "totale_oppervlakte": [4154300, 4154300, 8350, 8350, 24900, 24900],
+            "woonterrein": [380000, 381500, 1800, 1850, 2900, 3100],
+        }
+    )
+    crud.copy_upsert(db_engine=db_engine, table=models.Bodemgebruik, df=bodemgebruik)
+    crud.refresh_materialized_views(db_engine=db_engine)
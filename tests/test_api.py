@@ -1,5 +1,6 @@
 import requests
-from backend.utils import parse_response_metadata
+from backend.download import DownloadManifest
+from backend.utils import get_data_from_cbs, parse_response_metadata
 from backend import models
 
 
@@ -19,3 +20,65 @@ def test_get_burgstaat(mocker):
     assert result[1].burgerlijkestaat == "Ongehuwd"
     assert result[2].burgst_key == "1020   "
     assert result[2].burgerlijkestaat == "Gehuwd"
+
+
+def test_resume_download(tmp_path, cbs_server, mocker):
+    import polars as pl
+
+    mocker.patch("backend.download.time.sleep")
+    url = f"{cbs_server.url}/03759ned/TypedDataSet"
+    path = "/ODataFeed/odata/03759ned/TypedDataSet"
+
+    # The second page fails once and should be retried
+    cbs_server.fail_once.add((path, 2))
+    get_data_from_cbs(
+        object=models.Bevolking,
+        url=url,
+        num_processes=2,
+        chunk_size=2,
+        save_dir=tmp_path,
+    )
+
+    manifest = DownloadManifest(tmp_path / "bevolking.manifest.jsonl").completed()
+    assert sorted(manifest) == [0, 2, 4]
+    assert all(page["rows"] == 2 for page in manifest.values())
+    files = list((tmp_path / "bevolking").glob("*.parquet"))
+    assert len(files) <= 3
+    assert {page["file"] for page in manifest.values()} == {f.name for f in files}
+
+    df = pl.concat([pl.read_parquet(f) for f in files])
+    assert sorted(df["id"].to_list()) == [0, 1, 2, 3, 4, 5]
+    assert df.schema["bevolking_1_januari"] == pl.Int64
+    assert df.schema["regio_key"] == pl.Utf8
+
+    # A rerun only requests pages that aren't in the manifest yet
+    cbs_server.requests.clear()
+    get_data_from_cbs(
+        object=models.Bevolking,
+        url=url,
+        num_processes=2,
+        chunk_size=2,
+        save_dir=tmp_path,
+    )
+    assert not {skip for _, skip in cbs_server.requests} & set(manifest)
+
+
+def test_iterparse_properties():
+    import xml.etree.ElementTree as ET
+
+    from backend.utils import find_in_schema, iterparse_properties
+
+    with open("tests/test_data/bevolking.xml", "rb") as f:
+        content = f.read()
+
+    # Feed the parser small chunks, so entries are split across chunks
+    chunks = [content[i : i + 100] for i in range(0, len(content), 100)]
+    columns = iterparse_properties(
+        chunks=chunks, resp_keys=models.Bevolking.__resp_keys__()
+    )
+
+    entries = ET.fromstring(content).findall(".//{http://www.w3.org/2005/Atom}entry")
+    for key, value in models.Bevolking.__resp_keys__().items():
+        assert columns[value] == [find_in_schema(entry, key) for entry in entries]
+    assert columns["regio_key"][0] == "NL01  "
+    assert columns["gemiddelde_bevolking"][5] is None
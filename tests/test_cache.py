@@ -0,0 +1,36 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from backend.cache import ResultCache
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(cache_dir=tmp_path, max_bytes=2**20)
+    df = pl.DataFrame({"regio": ["Groningen", "Almere"], "jaar": [2022, 2023]})
+
+    assert cache.get("SELECT 1") is None
+    cache.put("SELECT 1", df)
+    assert_frame_equal(cache.get("SELECT 1"), df)
+
+    # A new data version invalidates the results
+    cache.bump_version()
+    assert cache.get("SELECT 1") is None
+    assert list(tmp_path.glob("*.arrow")) == []
+
+
+def test_result_cache_eviction(tmp_path):
+    df = pl.DataFrame({"value": range(10000)})
+    cache = ResultCache(cache_dir=tmp_path, max_bytes=0)
+    cache.put("SELECT 0", df)
+    size = cache.path("SELECT 0").stat().st_size
+
+    # Room for two results, so the least recently used one is evicted
+    cache.max_bytes = 2 * size
+    cache.put("SELECT 1", df)
+    cache.put("SELECT 2", df)
+    cache.get("SELECT 1")
+    cache.put("SELECT 3", df)
+
+    assert cache.get("SELECT 1") is not None
+    assert cache.get("SELECT 2") is None
+    assert cache.get("SELECT 3") is not None
@@ -2,6 +2,7 @@ from backend.db_tools import DBEngine
 from backend.config import Settings, DFType
 from backend import crud, models, utils
 import requests
+from sqlalchemy import select, text
 
 
 def test_get_connection():
@@ -31,3 +32,218 @@ def test_insert_data(mocker):
     assert df.shape[0] == 5
     assert df.select("burgerlijkestaat")[1].to_numpy() == "Ongehuwd"
     assert df.select("burgst_key")[3].to_numpy() == "1050   "
+
+
+def test_bulk_load_parquet(tmp_path, seed_dimensions):
+    import polars as pl
+
+    db_engine = DBEngine(**Settings().model_dump())
+    path = tmp_path / "Bevolking_10000.parquet"
+    df = pl.DataFrame(
+        {
+            "id": ["100", "101", "102"],
+            "geslacht_key": ["3000   ", "3000   ", "3000   "],
+            "leeftijd_key": ["10000", "10000", "10000"],
+            "burgst_key": ["T001019", "T001019", "T001019"],
+            "regio_key": ["GM0014", "GM0034", "GM9999"],
+            "datum_key": ["2023JJ00", "2023JJ00", "2023JJ00"],
+            "bevolking_1_januari": ["238000", None, "1"],
+            "gemiddelde_bevolking": ["239000.5", None, "1"],
+        }
+    )
+    df.write_parquet(path)
+
+    regios = pl.Series(["NL01  ", "GM0014", "GM0034"])
+    rows = utils.parse_parquet_to_db(
+        path=path,
+        object=models.Bevolking,
+        db_engine=db_engine,
+        regios=regios,
+        bulk=True,
+    )
+    assert rows == 2
+
+    # Loading a file again should update the existing rows instead of failing
+    df.with_columns(pl.lit("240000").alias("bevolking_1_januari")).write_parquet(path)
+    utils.parse_parquet_to_db(
+        path=path,
+        object=models.Bevolking,
+        db_engine=db_engine,
+        regios=regios,
+        bulk=True,
+    )
+
+    result = crud.fetch_data(
+        stmt=models.Bevolking.__table__.select()
+        .where(models.Bevolking.id >= 100)
+        .order_by(models.Bevolking.id),
+        db_engine=db_engine,
+    )
+    assert result.shape[0] == 2
+    assert result["bevolking_1_januari"].to_list() == [240000, 240000]
+
+
+def test_materialized_views(seed_facts):
+    db_engine = DBEngine(**Settings().model_dump())
+
+    df = crud.get_data_gemeentes(_db_engine=db_engine)
+    assert df.columns == [
+        "bevolking_1_januari",
+        "geslacht",
+        "regio",
+        "catgroup",
+        "burgerlijkestaat",
+        "jaar",
+    ]
+    assert df["regio"].to_list() == ["Almere", "Almere", "Groningen", "Groningen"]
+    assert df["bevolking_1_januari"].to_list() == [218096, 222825, 234649, 238147]
+
+    df = crud.get_bodemgebruik_landelijk(_db_engine=db_engine)
+    assert df.shape[0] == 2
+    assert "id" not in df.columns and "regio_key" not in df.columns
+    assert df["woonterrein"].to_list() == [380000, 381500]
+
+
+def explain(db_engine: DBEngine, query: str) -> list[tuple[str, str]]:
+    """Return the (node type, relation) of every node in the plan of a query."""
+    with db_engine.engine.connect() as connection:
+        # Sequential scans are only chosen now when no index can be used at all
+        connection.execute(text("SET enable_seqscan = off"))
+        plan = connection.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+        ).scalar()
+
+    nodes = []
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append((node["Node Type"], node.get("Relation Name")))
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+def test_no_sequential_scans(seed_facts, mocker):
+    db_engine = DBEngine(**Settings().model_dump())
+    fact_tables = {"bevolking", "bodemgebruik"}
+    fetch_data = mocker.spy(crud, "fetch_data")
+
+    queries = {}
+    for get in [
+        crud.get_bevolking_landelijk,
+        crud.get_bodemgebruik_landelijk,
+        crud.get_data_gemeentes,
+        crud.get_data_gemeentes_bodemgebruik,
+    ]:
+        get(_db_engine=db_engine)
+        stmt = fetch_data.call_args.kwargs["stmt"]
+        queries[get.__name__] = stmt.compile(
+            bind=db_engine.engine, compile_kwargs={"literal_binds": True}
+        ).string
+
+    # The materialized views are the queries on the fact tables
+    with db_engine.engine.connect() as connection:
+        for view, definition in connection.execute(
+            text("SELECT matviewname, definition FROM pg_matviews")
+        ):
+            fact_tables.add(view)
+            queries[view] = definition.rstrip(";")
+
+    for name, query in queries.items():
+        seq_scans = [
+            relation
+            for node_type, relation in explain(db_engine, query)
+            if node_type == "Seq Scan" and relation in fact_tables
+        ]
+        assert seq_scans == [], f"{name} scans {seq_scans} sequentially"
+
+
+def test_parquet_backend(seed_facts, tmp_path):
+    from polars.testing import assert_frame_equal
+
+    from backend.config import QueryBackend
+
+    db_engine = DBEngine(**Settings().model_dump())
+    parquet_engine = DBEngine(
+        **Settings().model_dump(exclude={"query_backend", "parquet_dir"}),
+        query_backend=QueryBackend.PARQUET,
+        parquet_dir=tmp_path,
+    )
+
+    # Write the tables of the database in the layout of the downloaded parquet files
+    for table in [models.Bevolking, models.Bodemgebruik]:
+        (tmp_path / table.__tablename__).mkdir()
+        crud.select_table_from_db(db_engine=db_engine, table=table).write_parquet(
+            tmp_path / table.__tablename__ / f"{table.__tablename__.title()}.parquet"
+        )
+    for table in [
+        models.Burgstaat,
+        models.CategoryGroup,
+        models.Geslacht,
+        models.Leeftijd,
+        models.Perioden,
+        models.Regios,
+    ]:
+        utils.save_dimension(
+            data=[row[0] for row in db_engine.session.execute(select(table)).all()],
+            object=table,
+            save_dir=tmp_path,
+        )
+
+    for get in [
+        crud.get_bevolking_landelijk,
+        crud.get_bodemgebruik_landelijk,
+        crud.get_data_gemeentes,
+        crud.get_data_gemeentes_bodemgebruik,
+    ]:
+        assert_frame_equal(
+            get(_db_engine=parquet_engine),
+            get(_db_engine=db_engine),
+            check_dtype=False,
+        )
+
+
+def test_growth_features(seed_facts, tmp_path, mocker):
+    from polars.testing import assert_frame_equal
+
+    from backend import features
+
+    db_engine = DBEngine(
+        **Settings().model_dump(exclude={"feature_dir"}), feature_dir=tmp_path
+    )
+    expected = features.build_growth_features(
+        df_bevolking=crud.get_data_gemeentes(_db_engine=db_engine),
+        df_bodem=crud.get_data_gemeentes_bodemgebruik(_db_engine=db_engine),
+    )
+    assert expected.height > 0
+
+    # The features are built once per data version, and read from disk afterwards
+    build = mocker.spy(features, "build_growth_features")
+    first = features.load_growth_features(db_engine=db_engine)
+    second = features.load_growth_features(db_engine=db_engine)
+    assert build.call_count == 1
+    assert_frame_equal(first, expected)
+    assert_frame_equal(second, expected)
+
+    version = features.data_version(db_engine)
+    assert [path.name for path in tmp_path.iterdir()] == [
+        f"growth_features_{version}.arrow"
+    ]
+
+
+def test_result_cache(seed_facts, mocker):
+    from polars.testing import assert_frame_equal
+
+    db_engine = DBEngine(**Settings().model_dump())
+    fetch_data = mocker.spy(crud, "fetch_data")
+
+    # Compute the result once, and serve it from the cache afterwards
+    first = crud.get_data_gemeentes(_db_engine=db_engine)
+    second = crud.get_data_gemeentes(_db_engine=db_engine)
+    assert fetch_data.call_count <= 1
+    assert_frame_equal(first, second)
+
+    # Refreshing the views invalidates the cache
+    crud.refresh_materialized_views(db_engine=db_engine)
+    fetch_data.reset_mock()
+    crud.get_data_gemeentes(_db_engine=db_engine)
+    assert fetch_data.call_count == 1
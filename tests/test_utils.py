@@ -0,0 +1,30 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from backend.utils import growth_columns_by_year
+from tests.bench_growth_columns import build_frame, growth_columns_by_year_loop
+
+
+def test_growth_columns_by_year():
+    df = build_frame(gemeentes=5, years=6, columns=3).with_columns(
+        pl.col("column_0").cast(pl.Int64)
+    )
+
+    result = growth_columns_by_year(df, columns_to_exclude=["regio", "jaar"])
+
+    expected = growth_columns_by_year_loop(df, columns_to_exclude=["regio", "jaar"])
+    assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_growth_columns_by_year_unordered():
+    df = build_frame(gemeentes=5, years=6, columns=3)
+    shuffled = df.sample(fraction=1.0, shuffle=True, seed=0)
+
+    result = growth_columns_by_year(shuffled, columns_to_exclude=["regio", "jaar"])
+
+    # The previous year is found within each regio, and the input order is kept
+    expected = growth_columns_by_year(df, columns_to_exclude=["regio", "jaar"])
+    assert_frame_equal(result.sort(["regio", "jaar"]), expected)
+    assert_frame_equal(
+        result.select(["regio", "jaar"]), shuffled.select(["regio", "jaar"])
+    )